@@ -161,6 +161,19 @@ class BOARDSETTING(ctypes.Structure):
                 ('timepreset',  ctypes.c_double), ]
 
 
+# Conversion between a DAC threshold level in V (-2.048 V to 2.048 V) and the
+# 16 bit word stored in the lower half of the dac0/dac1 settings.
+_DAC_WORD_SCALE = 0xffff / 4.096
+
+
+def _float_to_word(level):
+    return int((level + 2.048) * _DAC_WORD_SCALE)
+
+
+def _word_to_float(word):
+    return (word & 0xffff) / _DAC_WORD_SCALE - 2.048
+
+
 class FastComtec(Base, FastCounterInterface):
     """ Hardware Class for the FastComtec Card.
 
@@ -909,22 +922,15 @@ class FastComtec(Base, FastCounterInterface):
 def SetLevel(self, start, stop):
     setting = AcqSettings()
     self.dll.GetSettingData(ctypes.byref(setting), 0)
-
-    def FloatToWord(r):
-        return int((r + 2.048) / 4.096 * int('ffff', 16))
-
-    setting.dac0 = (setting.dac0 & int('ffff0000', 16)) | FloatToWord(start)
-    setting.dac1 = (setting.dac1 & int('ffff0000', 16)) | FloatToWord(stop)
+    setting.dac0 = (setting.dac0 & 0xffff0000) | _float_to_word(start)
+    setting.dac1 = (setting.dac1 & 0xffff0000) | _float_to_word(stop)
     self.dll.StoreSettingData(ctypes.byref(setting), 0)
     self.dll.NewSetting(0)
-    return self.GetLevel()
+    # the stored struct already holds the new levels, no need to read them back again
+    return _word_to_float(setting.dac0), _word_to_float(setting.dac1)
 
 
 def GetLevel(self):
     setting = AcqSettings()
     self.dll.GetSettingData(ctypes.byref(setting), 0)
-
-    def WordToFloat(word):
-        return (word & int('ffff', 16)) * 4.096 / int('ffff', 16) - 2.048
-
-    return WordToFloat(setting.dac0), WordToFloat(setting.dac1)
+    return _word_to_float(setting.dac0), _word_to_float(setting.dac1)
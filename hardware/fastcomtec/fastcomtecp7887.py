@@ -146,6 +146,48 @@ class ACQDATA(ctypes.Structure):
                 ('hct', ctypes.c_int), ]
 
 
+# Conversion between a DAC threshold level in V (-2.048 V to 2.048 V) and the
+# 16 bit word stored in the lower half of the dac0/dac1 settings.
+_DAC_WORD_SCALE = 0xffff / 4.096
+
+
+def _float_to_word(level):
+    return int((level + 2.048) * _DAC_WORD_SCALE)
+
+
+def _word_to_float(word):
+    return (word & 0xffff) / _DAC_WORD_SCALE - 2.048
+
+
+def _counts_to_ascii(counts):
+    """ Format an array of non-negative integers as newline separated decimal ASCII.
+
+    @param numpy.ndarray counts: count values to format
+
+    @return bytes: one decimal number per line, each terminated by a newline
+
+    The digits are computed column-wise for all values at once, so the cost does not scale with
+    a per-element Python format call.
+    """
+    counts = np.asarray(counts, dtype=np.uint64).ravel()
+    if counts.size == 0:
+        return b''
+    n_digits = len(str(int(counts.max())))
+    # one row per value: right-aligned digits followed by a newline
+    digits = np.empty((counts.size, n_digits + 1), dtype=np.uint8)
+    digits[:, -1] = ord('\n')
+    rest = counts.copy()
+    for col in range(n_digits - 1, -1, -1):
+        digits[:, col] = rest % 10 + ord('0')
+        rest //= 10
+    # strip the leading zeros of the shorter numbers
+    lengths = np.ones(counts.size, dtype=np.int64)
+    for exponent in range(1, n_digits):
+        lengths += counts >= 10 ** exponent
+    mask = np.arange(n_digits + 1) >= (n_digits - lengths)[:, np.newaxis]
+    return digits[mask].tobytes()
+
+
 class FastComtec(Base, FastCounterInterface):
     """ Hardware Class for the FastComtec Card.
 
@@ -182,6 +224,12 @@ class FastComtec(Base, FastCounterInterface):
         self.stopped_or_halt = "stopped"
         self.timetrace_tmp = []
 
+        # settings and status structs are reused for every read from the dll
+        self._acq_setting = AcqSettings()
+        self._acq_setting_ref = ctypes.byref(self._acq_setting)
+        self._acq_status = AcqStatus()
+        self._acq_status_ref = ctypes.byref(self._acq_status)
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -287,8 +335,7 @@ class FastComtec(Base, FastCounterInterface):
         3 = paused
         -1 = error state
         """
-        status = AcqStatus()
-        self.dll.GetStatusData(ctypes.byref(status), 0)
+        status = self._read_status()
         if status.started == 1:
             return 2
         elif status.started == 0:
@@ -310,8 +357,7 @@ class FastComtec(Base, FastCounterInterface):
         Returns the current runtime.
         @return float runtime: in s
         """
-        status = AcqStatus()
-        self.dll.GetStatusData(ctypes.byref(status), 0)
+        status = self._read_status()
         return status.runtime
 
     def get_current_sweeps(self):
@@ -323,8 +369,7 @@ class FastComtec(Base, FastCounterInterface):
         configuration. Here the number of trigger events is called "start". This is what is meant by the "sweep"
         parameter of the fast_counter interface.
         """
-        status = AcqStatus()
-        self.dll.GetStatusData(ctypes.byref(status), 0)
+        status = self._read_status()
         return status.stevents  # the number of trigger is named "stevents".
 
     def start_measure(self):
@@ -395,14 +440,11 @@ class FastComtec(Base, FastCounterInterface):
 
           @return arrray: Time trace.
         """
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
+        setting = self._read_settings()
         N = setting.range
 
         if self.gated:
-            bsetting=AcqSettings()
-            self.dll.GetSettingData(ctypes.byref(bsetting), 0)
-            H = bsetting.cycles
+            H = setting.cycles
             data = np.empty((H, int(N / H)), dtype=np.uint32)
 
         else:
@@ -432,14 +474,29 @@ class FastComtec(Base, FastCounterInterface):
     #                           Non Interface methods
     # =========================================================================
 
+    def _read_settings(self):
+        """ Read the current acquisition settings from the dll into the reused settings struct.
+
+        @return AcqSettings: the updated settings struct
+        """
+        self.dll.GetSettingData(self._acq_setting_ref, 0)
+        return self._acq_setting
+
+    def _read_status(self):
+        """ Read the current acquisition status from the dll into the reused status struct.
+
+        @return AcqStatus: the updated status struct
+        """
+        self.dll.GetStatusData(self._acq_status_ref, 0)
+        return self._acq_status
+
     def get_bitshift(self):
         """Get bitshift from Fastcomtec.
 
         @return int settings.bitshift: the red out bitshift
         """
 
-        settings = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(settings), 0)
+        settings = self._read_settings()
         return int(settings.bitshift)
 
     def set_bitshift(self, bitshift):
@@ -514,8 +571,7 @@ class FastComtec(Base, FastCounterInterface):
 
           @return int: length of the current measurement
         """
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
+        setting = self._read_settings()
         return int(setting.range)
 
     def _change_filename(self,name):
@@ -577,8 +633,7 @@ class FastComtec(Base, FastCounterInterface):
 
         @return float delay_s: current record delay length in seconds
         """
-        bsetting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(bsetting), 0)
+        bsetting = self._read_settings()
         delay_s = bsetting.fstchan * 6.4e-9 *2.5
         #prena = bsetting.prena
         return delay_s
@@ -598,39 +653,44 @@ class FastComtec(Base, FastCounterInterface):
         return self.GetDelay()
 
     def GetDelay(self):
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
+        setting = self._read_settings()
         return setting.fstchan * 6.4
 
 
     #former SaveData_fast
     def SaveData_locally(self, filename, laser_index):
         # os.chdir(r'D:\data\FastComTec')
-        data = self.get_data()
-        fil = open(filename + '.asc', 'w')
-        for i in laser_index:
-            for n in data[i:i+int(round(3000/(self.minimal_binwidth*2**self.GetBitshift())))
-                    +int(round(1000/(self.minimal_binwidth*2**self.GetBitshift())))]:
-                fil.write('{0!s}\n'.format(n))
-        fil.close()
+        data = self.get_data_trace()[0]
+        binwidth = self.minimal_binwidth * 2 ** self.get_bitshift()
+        window = int(round(3000 / binwidth)) + int(round(1000 / binwidth))
+        # most measurements only use a single laser pulse, skip the concatenation then
+        if len(laser_index) == 1:
+            i = laser_index[0]
+            arr = data[i:i + window]
+        else:
+            arr = np.concatenate([data[i:i + window] for i in laser_index])
+        # format everything at once and bypass the buffered text io layers
+        payload = _counts_to_ascii(arr)
+        fd = os.open(filename + '.asc', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(payload)
+            for start in range(0, len(view), 1 << 20):
+                os.write(fd, view[start:start + (1 << 20)])
+        finally:
+            os.close(fd)
 
     def SetLevel(self, start, stop):
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
-        def FloatToWord(r):
-            return int((r+2.048)/4.096*int('ffff',16))
-        setting.dac0 = ( setting.dac0 & int('ffff0000',16) ) | FloatToWord(start)
-        setting.dac1 = ( setting.dac1 & int('ffff0000',16) ) | FloatToWord(stop)
+        setting = self._read_settings()
+        setting.dac0 = (setting.dac0 & 0xffff0000) | _float_to_word(start)
+        setting.dac1 = (setting.dac1 & 0xffff0000) | _float_to_word(stop)
         self.dll.StoreSettingData(ctypes.byref(setting), 0)
         self.dll.NewSetting(0)
-        return self.GetLevel()
+        # the stored struct already holds the new levels, no need to read them back again
+        return _word_to_float(setting.dac0), _word_to_float(setting.dac1)
 
     def GetLevel(self):
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
-        def WordToFloat(word):
-            return (word & int('ffff',16)) * 4.096 / int('ffff',16) - 2.048
-        return WordToFloat(setting.dac0), WordToFloat(setting.dac1)
+        setting = self._read_settings()
+        return _word_to_float(setting.dac0), _word_to_float(setting.dac1)
 
     #used in one script for SSR
     #Todo: Remove
@@ -22,6 +22,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 
 import numpy as np
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 import PyDAQmx as daq
 
@@ -33,6 +34,17 @@ from interface.slow_counter_interface import CountingMode
 from interface.odmr_counter_interface import ODMRCounterInterface
 from interface.confocal_scanner_interface import ConfocalScannerInterface
 
+# extracts the device name from a full channel path like '/Dev1/PFI8'
+_CHANNEL_DEVICE_RE = re.compile(
+    r'^/(?P<dev>[0-9A-Za-z\- ]+[0-9A-Za-z\-_ ]*)/(?P<chan>[0-9A-Za-z]+)')
+
+# the single samples digital_channel_switch writes to switch all lines of a channel on or off
+_DIGITAL_ON = np.array([0xffffffff], dtype=np.uint32)
+_DIGITAL_OFF = np.array([0x0], dtype=np.uint32)
+
+# largest tick count a 32 bit counter can measure
+_MAX_COUNTER_TICKS = 2**32 - 1
+
 
 class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInterface, ODMRCounterInterface):
     """ A National Instruments device that can count and control microvave generators.
@@ -87,6 +99,8 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         max_counts: 3e7
         read_write_timeout: 10
         counting_edge_rising: True
+        use_dma: False # optional, not supported by USB devices
+        read_wait_poll: False # optional, scanner and ODMR reads poll instead of sleep
 
     """
 
@@ -123,29 +137,80 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
     # timeout for the Read or/and write process in s
     _RWTimeout = ConfigOption('read_write_timeout', default=10)
     _counting_edge_rising = ConfigOption('counting_edge_rising', default=True)
+    # transfer the counter input data via DMA instead of interrupts (PCIe and PXIe only)
+    _use_dma = ConfigOption('use_dma', default=False)
+    # scanner and ODMR reads wait for samples by polling instead of sleeping, this lowers
+    # the latency of short lines at the cost of keeping a CPU core busy while waiting
+    _read_wait_poll = ConfigOption('read_wait_poll', default=False)
 
     def on_activate(self):
         """ Starts up the NI Card at activation.
         """
+        # closes several tasks at once, the blocking DAQmx calls release the GIL
+        self._task_pool = ThreadPoolExecutor(max_workers=4)
+
+        # The number of samples read or written by the scanner and ODMR calls and
+        # the task state of get_status are stored here. Creating these ctypes
+        # values once saves their construction on every call.
+        self._scanner_read_samples = daq.int32()
+        self._scanner_analog_read_samples = daq.int32()
+        # The error code of this variable can be asked with .value to check
+        # whether all channels have been written successfully.
+        self._AONwritten = daq.int32()
+        self._task_done = daq.bool32()
+
         # the tasks used on that hardware device:
         self._counter_daq_tasks = list()
         self._counter_analog_daq_task = None
+        self._counter_count_buffer = None
+        self._counter_bin_buffer = None
+        self._counter_data_buffer = None
+        self._counter_error_data = None
+        self._counter_last_counts = None
         self._clock_daq_task = None
         self._scanner_clock_daq_task = None
         self._scanner_ao_task = None
         self._scanner_counter_daq_tasks = list()
         self._line_length = None
+        # readout buffers of scan_line, allocated by _set_up_line for the line length
+        self._scan_data = None
+        self._real_data = None
+        self._analog_data = None
+        # measurement and length the scanner clock and counting tasks are configured
+        # for, e.g. ('line', 100) or ('odmr', 100), None if they have to be set up
+        self._scanner_timing_setup = None
         self._odmr_length = None
+        # readout buffers of count_odmr, their content is copied into the returned array
+        self._odmr_count_buffer = None
+        self._odmr_analog_buffer = None
         self._gated_counter_daq_task = None
+        # readout buffer of get_gated_counts, reused as long as the number of samples stays
+        self._gated_count_buffer = None
+        self._gated_read_samples = daq.int32()
+        self._gated_available_samples = daq.uInt32()
+        # number of samples written by digital_channel_switch
+        self._digital_written = daq.int32()
+        # digital output tasks, created once per channel and kept committed
+        self._digital_out_tasks = {}
         self._scanner_analog_daq_task = None
         self._odmr_pulser_daq_task = None
-        self._oversampling = 0
+        self.oversampling = 0
         self._lock_in_active = False
 
         self._photon_sources = self._photon_sources if self._photon_sources is not None else list()
         self._scanner_counter_channels = self._scanner_counter_channels if self._scanner_counter_channels is not None else list()
         self._scanner_ai_channels = self._scanner_ai_channels if self._scanner_ai_channels is not None else list()
 
+        # the channel names only depend on the config, build them once
+        self._counter_channel_names = tuple(self._counter_channels) + tuple(self._counter_ai_channels)
+        self._scanner_count_channel_names = (
+            tuple(self._scanner_counter_channels) + tuple(self._scanner_ai_channels))
+        # the terminal of the scanner clock used to time the scanner tasks
+        self._scanner_clock_terminal = self._scanner_clock_channel + 'InternalOutput'
+        # the analog input range as a pair of floats, whatever type the config holds
+        self._counter_voltage_range = (float(self._counter_voltage_range[0]),
+                                       float(self._counter_voltage_range[1]))
+
         # handle all the parameters given by the config
         self._current_position = np.zeros(len(self._scanner_ao_channels))
 
@@ -157,6 +222,17 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error(
                 'Specify at least as many scanner_position_ranges as scanner_ao_channels!')
 
+        # check the order of all range limits at once
+        for name, ranges in (('scanner_voltage_ranges', self._scanner_voltage_ranges),
+                             ('scanner_position_ranges', self._scanner_position_ranges)):
+            ranges = np.asarray(ranges, dtype=np.float64).reshape((-1, 2))
+            wrong_order = np.flatnonzero(ranges[:, 0] > ranges[:, 1])
+            if wrong_order.size > 0:
+                self.log.error('The {0} with the indices {1} have the wrong order.'
+                               ''.format(name, wrong_order.tolist()))
+
+        self._update_scanner_conversion()
+
         if len(self._scanner_counter_channels) + len(self._scanner_ai_channels) < 1:
             self.log.error(
                 'Specify at least one counter or analog input channel for the scanner!')
@@ -171,14 +247,17 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         """ Shut down the NI card.
         """
         self._stop_analog_output()
+        for channel_name in list(self._digital_out_tasks):
+            self.close_digital_channel(channel_name)
         # clear the task
         try:
             daq.DAQmxClearTask(self._scanner_ao_task)
             self._scanner_ao_task = None
-        except:
+        except Exception:
             self.log.exception('Could not clear AO Out Task.')
 
         self.reset_hardware()
+        self._task_pool.shutdown()
 
     # =================== SlowCounterInterface Commands ========================
 
@@ -214,49 +293,38 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         @return int: error code (0:OK, -1:error)
         """
 
-        if not scanner and self._clock_daq_task is not None:
-            self.log.error('Another counter clock is already running, close this one first.')
-            return -1
-
-        if scanner and self._scanner_clock_daq_task is not None:
-            self.log.error('Another scanner clock is already running, close this one first.')
-            return -1
-
-        # Create handle for task, this task will generate pulse signal for
-        # photon counting
-        my_clock_daq_task = daq.TaskHandle()
-
-        # assign the clock frequency, if given
-        if clock_frequency is not None:
-            if not scanner:
-                self._clock_frequency = float(clock_frequency)
-            else:
+        # resolve the frequency and channel of the requested clock once, given values
+        # replace the stored ones
+        if scanner:
+            if self._scanner_clock_daq_task is not None:
+                self.log.error('Another scanner clock is already running, close this one first.')
+                return -1
+            if clock_frequency is not None:
                 self._scanner_clock_frequency = float(clock_frequency)
-        else:
-            if not scanner:
-                self._clock_frequency = self._default_clock_frequency
             else:
                 self._scanner_clock_frequency = self._default_scanner_clock_frequency
-
-        # use the correct clock in this method
-        if scanner:
-            my_clock_frequency = self._scanner_clock_frequency * 2
-        else:
-            my_clock_frequency = self._clock_frequency * 2
-
-        # assign the clock channel, if given
-        if clock_channel is not None:
-            if not scanner:
-                self._clock_channel = clock_channel
-            else:
+            if clock_channel is not None:
                 self._scanner_clock_channel = clock_channel
-
-        # use the correct clock channel in this method
-        if scanner:
+                self._scanner_clock_terminal = clock_channel + 'InternalOutput'
+            my_clock_frequency = self._scanner_clock_frequency
             my_clock_channel = self._scanner_clock_channel
         else:
+            if self._clock_daq_task is not None:
+                self.log.error('Another counter clock is already running, close this one first.')
+                return -1
+            if clock_frequency is not None:
+                self._clock_frequency = float(clock_frequency)
+            else:
+                self._clock_frequency = self._default_clock_frequency
+            if clock_channel is not None:
+                self._clock_channel = clock_channel
+            my_clock_frequency = self._clock_frequency
             my_clock_channel = self._clock_channel
 
+        # Create handle for task, this task will generate pulse signal for
+        # photon counting
+        my_clock_daq_task = daq.TaskHandle()
+
         # check whether only one clock pair is available, since some NI cards
         # only one clock channel pair.
         if self._scanner_clock_channel == self._clock_channel:
@@ -290,10 +358,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 my_idle,
                 # initial delay
                 0,
-                # pulse frequency, divide by 2 such that length of semi period = count_interval
-                my_clock_frequency / 2,
+                # pulse frequency, one period per count interval
+                my_clock_frequency,
                 # duty cycle of pulses, 0.5 such that high and low duration are both
-                # equal to count_interval
+                # equal to half of the count interval (semi periods for the scanner)
                 0.5)
 
             # Configure Implicit Timing.
@@ -309,11 +377,13 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
             if scanner:
                 self._scanner_clock_daq_task = my_clock_daq_task
+                # the timing has to be configured again for the new clock
+                self._scanner_timing_setup = None
             else:
                 # actually start the preconfigured clock task
                 daq.DAQmxStartTask(my_clock_daq_task)
                 self._clock_daq_task = my_clock_daq_task
-        except:
+        except daq.DAQError:
             self.log.exception('Error while setting up clock.')
             return -1
         return 0
@@ -355,133 +425,149 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                            ''.format(len(my_photon_sources), len(my_counter_channels)))
             return -1
 
+        edge = daq.DAQmx_Val_Rising if self._counting_edge_rising else daq.DAQmx_Val_Falling
+        # input buffer length, holds at least 10 s of samples so slow reads do not overflow it
+        buffer_length = int(max(10 * self._clock_frequency, 10000))
+        clock_terminal = my_clock_channel + 'InternalOutput'
+        ai_channels = ', '.join(self._counter_ai_channels)
         try:
+            # All counter channels share the same clock, so they are combined in a
+            # single task which is read with one call.
+            # This task will count photons with binning defined by the clock_channel
+            task = daq.TaskHandle()  # Initialize a Task
+            # Create task for the counter
+            daq.DAQmxCreateTask('Counter', daq.byref(task))
+            # add task to counter task list right away, so it is cleaned up on error
+            self._counter_daq_tasks.append(task)
+
             for i, ch in enumerate(my_counter_channels):
-                # This task will count photons with binning defined by the clock_channel
-                task = daq.TaskHandle()  # Initialize a Task
-                # Create task for the counter
-                daq.DAQmxCreateTask('Counter{0}'.format(i), daq.byref(task))
-                # Create a Counter Input which samples with Semi-Periodes the Channel.
-                # set up semi period width measurement in photon ticks, i.e. the width
-                # of each pulse (high and low) generated by pulse_out_task is measured
-                # in photon ticks.
-                #   (this task creates a channel to measure the time between state
-                #    transitions of a digital signal and adds the channel to the task
-                #    you choose)
-                daq.DAQmxCreateCISemiPeriodChan(
+                # Create a Counter Input which counts the photon edges.
+                # The counter accumulates the edges continuously and its value is
+                # sampled once per clock period, so the number of photons in a bin
+                # is the difference of two successive samples.
+                daq.DAQmxCreateCICountEdgesChan(
                     # define to which task to connect this function
                     task,
                     # use this counter channel
                     ch,
                     # name to assign to it
                     'Counter Channel {0}'.format(i),
-                    # expected minimum count value
+                    # count on the configured edge of the photon pulses
+                    edge,
+                    # initial count value
                     0,
-                    # Expected maximum count value
-                    self._max_counts / 2 / self._clock_frequency,
-                    # units of width measurement, here photon ticks
-                    daq.DAQmx_Val_Ticks,
-                    # empty extra argument
-                    '')
-
-                # Set the Counter Input to a Semi Period input Terminal.
-                # Connect the pulses from the counter clock to the counter channel
-                daq.DAQmxSetCISemiPeriodTerm(
-                        # The task to which to add the counter channel.
-                        task,
-                        # use this counter channel
-                        ch,
-                        # assign a named Terminal
-                        my_clock_channel + 'InternalOutput')
+                    # count direction
+                    daq.DAQmx_Val_CountUp)
 
-                # Set a Counter Input Control Timebase Source.
-                # Specify the terminal of the timebase which is used for the counter:
-                # Define the source of ticks for the counter as self._photon_source for
-                # the Scanner Task.
-                daq.DAQmxSetCICtrTimebaseSrc(
+                # Set the Counter Input Count Edges Terminal.
+                # Define the source of the counted edges as the photon source:
+                daq.DAQmxSetCICountEdgesTerm(
                     # define to which task to connect this function
                     task,
                     # counter channel
                     ch,
-                    # counter channel to output the counting results
+                    # terminal of the photon source to count from
                     my_photon_sources[i])
 
-                # Configure Implicit Timing.
-                # Set timing to continuous, i.e. set only the number of samples to
-                # acquire or generate without specifying timing:
-                daq.DAQmxCfgImplicitTiming(
-                    # define to which task to connect this function
-                    task,
-                    # Sample Mode: Acquire or generate samples until you stop the task.
-                    daq.DAQmx_Val_ContSamps,
-                    # buffer length which stores  temporarily the number of generated samples
-                    1000)
+                # Transfer the samples via DMA to avoid the overhead of interrupts
+                if self._use_dma:
+                    daq.DAQmxSetCIDataXferMech(task, ch, daq.DAQmx_Val_DMA)
+
+            # Configure the Sample Clock Timing.
+            # Latch the counter values on every rising edge of the counter clock,
+            # i.e. once per bin, and acquire continuously:
+            daq.DAQmxCfgSampClkTiming(
+                # define to which task to connect this function
+                task,
+                # use the counter clock as sample clock
+                clock_terminal,
+                # expected sample clock frequency
+                self._clock_frequency,
+                # sample on the rising edge of the clock
+                daq.DAQmx_Val_Rising,
+                # Sample Mode: Acquire or generate samples until you stop the task.
+                daq.DAQmx_Val_ContSamps,
+                # buffer length which stores  temporarily the number of generated samples
+                buffer_length)
+            # the sample clock timing does not resize the input buffer on all devices
+            daq.DAQmxSetBufInputBufSize(task, buffer_length)
+
+            # Do not start the task implicitly by a read, it is started explicitly below
+            daq.DAQmxSetReadAutoStart(task, False)
+
+            # Set the Read point Relative To an operation.
+            # Specifies the point in the buffer at which to begin a read operation.
+            # Here we read most recent recorded samples:
+            daq.DAQmxSetReadRelativeTo(
+                # define to which task to connect this function
+                task,
+                # Start reading samples relative to the last sample returned by the previously.
+                daq.DAQmx_Val_CurrReadPos)
+
+            # Set the Read Offset.
+            # Specifies an offset in samples per channel at which to begin a read
+            # operation. This offset is relative to the location you specify with
+            # RelativeTo. Here we set the Offset to 0 for multiple samples:
+            daq.DAQmxSetReadOffset(task, 0)
+
+            # Set Read OverWrite Mode.
+            # Specifies whether to overwrite samples in the buffer that you have
+            # not yet read. Unread data in buffer will be overwritten:
+            daq.DAQmxSetReadOverWrite(
+                task,
+                daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
 
-                # Set the Read point Relative To an operation.
-                # Specifies the point in the buffer at which to begin a read operation.
-                # Here we read most recent recorded samples:
-                daq.DAQmxSetReadRelativeTo(
-                    # define to which task to connect this function
-                    task,
-                    # Start reading samples relative to the last sample returned by the previously.
-                    daq.DAQmx_Val_CurrReadPos)
+            # Counter analog input task
+            if len(self._counter_ai_channels) > 0:
+                atask = daq.TaskHandle()
 
-                # Set the Read Offset.
-                # Specifies an offset in samples per channel at which to begin a read
-                # operation. This offset is relative to the location you specify with
-                # RelativeTo. Here we set the Offset to 0 for multiple samples:
-                daq.DAQmxSetReadOffset(task, 0)
+                daq.DAQmxCreateTask('CounterAnalogIn', daq.byref(atask))
 
-                # Set Read OverWrite Mode.
-                # Specifies whether to overwrite samples in the buffer that you have
-                # not yet read. Unread data in buffer will be overwritten:
-                daq.DAQmxSetReadOverWrite(
-                    task,
-                    daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
-                # add task to counter task list
-                self._counter_daq_tasks.append(task)
-
-                # Counter analog input task
-                if len(self._counter_ai_channels) > 0:
-                    atask = daq.TaskHandle()
-
-                    daq.DAQmxCreateTask('CounterAnalogIn', daq.byref(atask))
-
-                    daq.DAQmxCreateAIVoltageChan(
-                        atask,
-                        ', '.join(self._counter_ai_channels),
-                        'Counter Analog In',
-                        daq.DAQmx_Val_RSE,
-                        self._counter_voltage_range[0],
-                        self._counter_voltage_range[1],
-                        daq.DAQmx_Val_Volts,
-                        ''
-                    )
-                    # Analog in channel timebase
-                    daq.DAQmxCfgSampClkTiming(
-                        atask,
-                        my_clock_channel + 'InternalOutput',
-                        self._clock_frequency,
-                        daq.DAQmx_Val_Rising,
-                        daq.DAQmx_Val_ContSamps,
-                        int(self._clock_frequency * 5)
-                    )
-                    self._counter_analog_daq_task = atask
-        except:
+                self._create_ai_voltage_chan(
+                    atask, ai_channels, 'Counter Analog In', self._counter_voltage_range)
+                if self._use_dma:
+                    daq.DAQmxSetAIDataXferMech(
+                        atask, ai_channels, daq.DAQmx_Val_DMA)
+                # Analog in channel timebase
+                daq.DAQmxCfgSampClkTiming(
+                    atask,
+                    clock_terminal,
+                    self._clock_frequency,
+                    daq.DAQmx_Val_Rising,
+                    daq.DAQmx_Val_ContSamps,
+                    buffer_length
+                )
+                daq.DAQmxSetBufInputBufSize(atask, buffer_length)
+                self._counter_analog_daq_task = atask
+
+            # flat buffers the counter readout is written into, reused by every get_counter call
+            self._counter_count_buffer = np.empty(
+                len(my_counter_channels) * self._default_samples_number, dtype=np.uint32)
+            self._counter_bin_buffer = np.empty_like(self._counter_count_buffer)
+            # the edge counters start at 0, this is the reference for the first bin
+            self._counter_last_counts = np.zeros(len(my_counter_channels), dtype=np.uint32)
+            # the scaled counter and analog data of all channels returned by get_counter,
+            # the analog input is read directly into its last rows
+            self._counter_data_buffer = np.empty(
+                len(self._counter_channel_names) * self._default_samples_number, dtype=np.float64)
+            # the number of samples actually read is stored here by every get_counter call
+            self._counter_read_samples = daq.int32()
+            self._counter_analog_read_samples = daq.int32()
+        except daq.DAQError:
             self.log.exception('Error while setting up counting task.')
             return -1
 
         try:
-            for i, task in enumerate(self._counter_daq_tasks):
+            for task in self._counter_daq_tasks:
                 # Actually start the preconfigured counter task
                 daq.DAQmxStartTask(task)
             if len(self._counter_ai_channels) > 0:
                 daq.DAQmxStartTask(self._counter_analog_daq_task)
-        except:
+        except daq.DAQError:
             self.log.exception('Error while starting Counter')
             try:
                 self.close_counter()
-            except:
+            except Exception:
                 self.log.exception('Could not close counter after error')
             return -1
         return 0
@@ -493,9 +579,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         Most methods calling this might just care about the number of channels, though.
         """
-        ch = self._counter_channels[:]
-        ch.extend(self._counter_ai_channels)
-        return ch
+        return self._counter_channel_names
 
     def get_counter(self, samples=None):
         """ Returns the current counts per second of the counter.
@@ -506,87 +590,109 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                             That sets also the length of the readout array.
 
         @return float [samples]: array with entries as photon counts per second
+
+        The returned array is a view on a buffer that is overwritten by the next call.
         """
+        if samples is None:
+            samples = int(self._default_samples_number)
+        else:
+            samples = int(samples)
+
         if len(self._counter_daq_tasks) < 1:
             self.log.error(
                 'No counter running, call set_up_counter before reading it.')
             # in case of error return a lot of -1
-            return np.ones((len(self.get_counter_channels()), samples), dtype=np.uint32) * -1
+            return self._get_counter_error_data(samples)
 
         if len(self._counter_ai_channels) > 0 and self._counter_analog_daq_task is None:
             self.log.error(
                 'No counter analog input task running, call set_up_counter before reading it.')
             # in case of error return a lot of -1
-            return np.ones((len(self.get_counter_channels()), samples), dtype=np.uint32) * -1
-
-        if samples is None:
-            samples = int(self._samples_number)
-        else:
-            samples = int(samples)
+            return self._get_counter_error_data(samples)
+
+        # The readout arrays are C-contiguous views on the front of the flat buffers,
+        # which are only reallocated if more samples are requested than they can hold.
+        n_counter_channels = self._counter_last_counts.size
+        if self._counter_count_buffer.size < n_counter_channels * samples:
+            self._counter_count_buffer = np.empty(n_counter_channels * samples, dtype=np.uint32)
+            self._counter_bin_buffer = np.empty_like(self._counter_count_buffer)
+            self._counter_data_buffer = np.empty(
+                len(self._counter_channel_names) * samples, dtype=np.float64)
+        count_data = self._counter_count_buffer[:n_counter_channels * samples].reshape(
+            (n_counter_channels, samples))
+        all_data = self._counter_data_buffer[:len(self._counter_channel_names) * samples].reshape(
+            (len(self._counter_channel_names), samples))
+        # the last rows of a C-ordered array are contiguous, so the analog input
+        # can be written straight into the returned array
+        analog_data = all_data[n_counter_channels:]
         try:
-            # count data will be written here in the NumPy array of length samples
-            count_data = np.empty((len(self._counter_daq_tasks), 2 * samples), dtype=np.uint32)
-
-            # number of samples which were actually read, will be stored here
-            n_read_samples = daq.int32()
-            for i, task in enumerate(self._counter_daq_tasks):
-                # read the counter value: This function is blocking and waits for the
-                # counts to be all filled:
-                daq.DAQmxReadCounterU32(
-                    # read from this task
-                    task,
-                    # number of samples to read
-                    2 * samples,
-                    # maximal timeout for the read process
-                    self._RWTimeout,
-                    # write the readout into this array
-                    count_data[i],
-                    # length of array to write into
-                    2 * samples,
-                    # number of samples which were read
-                    daq.byref(n_read_samples),
-                    # Reserved for future use. Pass NULL (here None) to this parameter
-                    None)
+
+            # read the values of all counter channels in one go, one row per channel.
+            # This function is blocking and waits for the counts to be all filled:
+            daq.DAQmxReadCounterU32Ex(
+                # read from this task
+                self._counter_daq_tasks[0],
+                # number of samples per channel to read
+                samples,
+                # maximal timeout for the read process
+                self._RWTimeout,
+                # group the samples by channel
+                daq.DAQmx_Val_GroupByChannel,
+                # write the readout into this array
+                count_data,
+                # length of array to write into
+                count_data.size,
+                # number of samples per channel which were read
+                daq.byref(self._counter_read_samples),
+                # Reserved for future use. Pass NULL (here None) to this parameter
+                None)
 
             # Analog channels
             if len(self._counter_ai_channels) > 0:
-                analog_data = np.full(
-                    (len(self._counter_ai_channels), samples), 111, dtype=np.float64)
-
-                analog_read_samples = daq.int32()
-
                 daq.DAQmxReadAnalogF64(
                     self._counter_analog_daq_task,
                     samples,
                     self._RWTimeout,
                     daq.DAQmx_Val_GroupByChannel,
                     analog_data,
-                    len(self._counter_ai_channels) * samples,
-                    daq.byref(analog_read_samples),
+                    analog_data.size,
+                    daq.byref(self._counter_analog_read_samples),
                     None
                 )
-        except:
+        except daq.DAQError:
             self.log.exception(
                 'Getting samples from counter failed.')
             # in case of error return a lot of -1
-            return np.ones((len(self.get_counter_channels()), samples), dtype=np.uint32) * -1
-
-        real_data = np.empty((len(self._counter_channels), samples), dtype=np.uint32)
+            return self._get_counter_error_data(samples)
 
-        # add up adjoint pixels to also get the counts from the low time of
-        # the clock:
-        real_data = count_data[:, ::2]
-        real_data += count_data[:, 1::2]
+        # the photons of each bin are the difference of successive counter values,
+        # the unsigned arithmetic also takes care of a counter roll over
+        real_data = self._counter_bin_buffer[:n_counter_channels * samples].reshape(
+            (n_counter_channels, samples))
+        np.subtract(count_data[:, 0], self._counter_last_counts, out=real_data[:, 0])
+        np.subtract(count_data[:, 1:], count_data[:, :-1], out=real_data[:, 1:])
+        self._counter_last_counts[:] = count_data[:, -1]
 
-        all_data = np.full((len(self.get_counter_channels()), samples), 222, dtype=np.float64)
         # normalize to counts per second for counter channels
-        all_data[0:len(real_data)] = np.array(real_data * self._clock_frequency, np.float64)
-
-        if len(self._counter_ai_channels) > 0:
-            all_data[-len(self._counter_ai_channels):] = analog_data
+        np.multiply(real_data, self._clock_frequency, out=all_data[0:len(real_data)])
 
         return all_data
 
+    def _get_counter_error_data(self, samples):
+        """ Returns an array of -1 with the shape of a get_counter readout to signal an error.
+
+        @param int samples: number of samples per channel
+
+        @return float [channels][samples]: read only view of a cached array filled with -1
+        """
+        n_channels = len(self._counter_channel_names)
+        error_data = self._counter_error_data
+        if error_data is None or error_data.shape[0] != n_channels or error_data.shape[1] < samples:
+            error_data = np.full((n_channels, samples), -1, dtype=np.float64)
+            error_data.flags.writeable = False
+            self._counter_error_data = error_data
+        return error_data[:, :samples]
+
     def close_counter(self, scanner=False):
         """ Closes the counter or scanner and cleans up afterwards.
 
@@ -597,44 +703,50 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         @return int: error code (0:OK, -1:error)
         """
-        error = 0
         if scanner:
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                try:
-                    # stop the counter task
-                    daq.DAQmxStopTask(task)
-                    # after stopping delete all the configuration of the counter
-                    daq.DAQmxClearTask(task)
-                except:
-                    self.log.exception('Could not close scanner counter.')
-                    error = -1
+            error = self._close_tasks(
+                self._scanner_counter_daq_tasks, 'Could not close scanner counter.')
             self._scanner_counter_daq_tasks = []
+            self._scanner_timing_setup = None
         else:
-            for i, task in enumerate(self._counter_daq_tasks):
-                try:
-                    # stop the counter task
-                    daq.DAQmxStopTask(task)
-                    # after stopping delete all the configuration of the counter
-                    daq.DAQmxClearTask(task)
-                    # set the task handle to None as a safety
-                except:
-                    self.log.exception('Could not close counter.')
-                    error = -1
+            tasks = list(self._counter_daq_tasks)
+            if len(self._counter_ai_channels) > 0:
+                tasks.append(self._counter_analog_daq_task)
+            error = self._close_tasks(tasks, 'Could not close counter.')
             self._counter_daq_tasks = []
+            # set the task handle to None as a safety
+            self._counter_analog_daq_task = None
+        return error
 
-            if len(self._counter_ai_channels) > 0:
-                try:
-                    # stop the counter task
-                    daq.DAQmxStopTask(self._counter_analog_daq_task)
-                    # after stopping delete all the configuration of the counter
-                    daq.DAQmxClearTask(self._counter_analog_daq_task)
-                    # set the task handle to None as a safety
-                except:
-                    self.log.exception('Could not close counter analog channels.')
-                    error = -1
-                self._counter_analog_daq_task = None
+    def _close_tasks(self, tasks, error_message):
+        """ Stops and clears several tasks in parallel.
+
+        @param list tasks: handles of the tasks to close
+        @param str error_message: logged for every task that could not be closed
+
+        @return int: error code (0:OK, -1:error)
+        """
+        error = 0
+        futures = [self._task_pool.submit(self._close_task, task) for task in tasks]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                self.log.exception(error_message)
+                error = -1
         return error
 
+    @staticmethod
+    def _close_task(task):
+        """ Stops a single task and clears its configuration.
+
+        @param TaskHandle task: the task to close
+        """
+        # stop the task
+        daq.DAQmxStopTask(task)
+        # after stopping delete all the configuration of the task
+        daq.DAQmxClearTask(task)
+
     def close_clock(self, scanner=False):
         """ Closes the clock and cleans up afterwards.
 
@@ -659,9 +771,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # Set the task handle to None as a safety
             if scanner:
                 self._scanner_clock_daq_task = None
+                self._scanner_timing_setup = None
             else:
                 self._clock_daq_task = None
-        except:
+        except Exception:
             self.log.exception('Could not close clock.')
             return -1
         return 0
@@ -691,18 +804,18 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         for channel in chanlist:
             if channel is None:
                 continue
-            match = re.match(
-                '^/(?P<dev>[0-9A-Za-z\- ]+[0-9A-Za-z\-_ ]*)/(?P<chan>[0-9A-Za-z]+)',
-                channel)
+            match = _CHANNEL_DEVICE_RE.match(channel)
             if match:
                 devicelist.append(match.group('dev'))
             else:
                 self.log.error('Did not find device name in {0}.'.format(channel))
+        # resetting the devices invalidates every kept digital output task
+        self._digital_out_tasks.clear()
         for device in set(devicelist):
             self.log.info('Reset device {0}.'.format(device))
             try:
                 daq.DAQmxResetDevice(device)
-            except:
+            except Exception:
                 self.log.exception('Could not reset NI device {0}'.format(device))
                 retval = -1
         return retval
@@ -721,10 +834,11 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         return possible_channels[0:int(n_channels.value)]
 
     def get_scanner_count_channels(self):
-        """ Return list of counter channels """
-        ch = self._scanner_counter_channels[:]
-        ch.extend(self._scanner_ai_channels)
-        return ch
+        """ Return list of counter channels
+
+        @return tuple(str): channel names
+        """
+        return self._scanner_count_channel_names
 
     def get_position_range(self):
         """ Returns the physical range of the scanner.
@@ -757,18 +871,22 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 ''.format(len(myrange)))
             return -1
 
-        for pos in myrange:
-            if len(pos) != 2:
-                self.log.error(
-                    'Given range limit {1:d} should have dimension 2, but has {0:d} instead.'
-                    ''.format(len(pos), pos))
-                return -1
-            if pos[0]>pos[1]:
-                self.log.error(
-                    'Given range limit {0:d} has the wrong order.'.format(pos))
-                return -1
+        try:
+            myrange = np.array(myrange, dtype=np.float64)
+        except (TypeError, ValueError):
+            myrange = None
+        if myrange is None or myrange.shape != (4, 2):
+            self.log.error('Every given range limit should have dimension 2.')
+            return -1
+
+        wrong_order = np.flatnonzero(myrange[:, 0] > myrange[:, 1])
+        if wrong_order.size > 0:
+            self.log.error(
+                'Given range limit {0} has the wrong order.'.format(myrange[wrong_order[0]]))
+            return -1
 
         self._scanner_position_ranges = myrange
+        self._update_scanner_conversion()
         return 0
 
     def set_voltage_range(self, myrange=None):
@@ -792,12 +910,22 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 ''.format(len(myrange)))
             return -1
 
-        for r in myrange:
-            if r[0] > r[1]:
-                self.log.error('Given range limit {0:d} has the wrong order.'.format(r))
-                return -1
+        try:
+            myrange = np.array(myrange, dtype=np.float64)
+        except (TypeError, ValueError):
+            myrange = None
+        if myrange is None or myrange.shape != (n_ch, 2):
+            self.log.error('Every given range limit should have dimension 2.')
+            return -1
+
+        wrong_order = np.flatnonzero(myrange[:, 0] > myrange[:, 1])
+        if wrong_order.size > 0:
+            self.log.error(
+                'Given range limit {0} has the wrong order.'.format(myrange[wrong_order[0]]))
+            return -1
 
         self._scanner_voltage_ranges = myrange
+        self._update_scanner_conversion()
         return 0
 
     def _start_analog_output(self):
@@ -824,24 +952,33 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # create the actual analog output task on the hardware device. Via
             # byref you pass the pointer of the object to the TaskCreation function:
             daq.DAQmxCreateTask('ScannerAO', daq.byref(self._scanner_ao_task))
-            for n, chan in enumerate(self._scanner_ao_channels):
+            # channels with the same voltage range are created together in one call,
+            # consecutive runs keep the channel order of the task
+            n_channels = len(self._scanner_ao_channels)
+            first = 0
+            while first < n_channels:
+                last = first + 1
+                while (last < n_channels and list(self._scanner_voltage_ranges[last])
+                       == list(self._scanner_voltage_ranges[first])):
+                    last += 1
                 # Assign and configure the created task to an analog output voltage channel.
                 daq.DAQmxCreateAOVoltageChan(
                     # The AO voltage operation function is assigned to this task.
                     self._scanner_ao_task,
                     # use (all) scanner ao_channels for the output
-                    chan,
-                    # assign a name for that channel
-                    'Scanner AO Channel {0}'.format(n),
+                    ', '.join(self._scanner_ao_channels[first:last]),
+                    # assign a name for each of these channels
+                    ', '.join('Scanner AO Channel {0}'.format(n) for n in range(first, last)),
                     # minimum possible voltage
-                    self._scanner_voltage_ranges[n][0],
+                    self._scanner_voltage_ranges[first][0],
                     # maximum possible voltage
-                    self._scanner_voltage_ranges[n][1],
+                    self._scanner_voltage_ranges[first][1],
                     # units is Volt
                     daq.DAQmx_Val_Volts,
                     # empty for future use
                     '')
-        except:
+                first = last
+        except Exception:
             self.log.exception('Error starting analog output task.')
             return -1
         return 0
@@ -857,12 +994,12 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         try:
             # stop the analog output task
             daq.DAQmxStopTask(self._scanner_ao_task)
-        except:
+        except Exception:
             self.log.exception('Error stopping analog output.')
             retval = -1
         try:
             daq.DAQmxSetSampTimingType(self._scanner_ao_task, daq.DAQmx_Val_OnDemand)
-        except:
+        except Exception:
             self.log.exception('Error changing analog output mode.')
             retval = -1
         return retval
@@ -912,6 +1049,9 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         my_counter_channels = counter_channels if counter_channels else self._scanner_counter_channels
         my_photon_sources = sources if sources else self._photon_sources
         self._my_scanner_clock_channel = clock_channel if clock_channel else self._scanner_clock_channel
+        self._my_scanner_clock_terminal = self._my_scanner_clock_channel + 'InternalOutput'
+        # the scanner tasks change, their timing has to be configured again
+        self._scanner_timing_setup = None
 
         if scanner_ao_channels is not None:
             self._scanner_ao_channels = scanner_ao_channels
@@ -930,6 +1070,8 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # demanded by software.
             daq.DAQmxSetSampTimingType(self._scanner_ao_task, daq.DAQmx_Val_OnDemand)
 
+            # the expected maximum count value is the same for all channels
+            max_semi_period_counts = self._max_semi_period_counts()
             for i, ch in enumerate(my_counter_channels):
                 # create handle for task, this task will do the photon counting for the
                 # scanner.
@@ -955,7 +1097,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # expected minimum value
                     0,
                     # Expected maximum count value
-                    self._max_counts / self._scanner_clock_frequency,
+                    max_semi_period_counts,
                     # units of width measurement, here Timebase photon ticks
                     daq.DAQmx_Val_Ticks,
                     '')
@@ -968,7 +1110,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # use this counter channel
                     ch,
                     # assign a Terminal Name
-                    self._my_scanner_clock_channel + 'InternalOutput')
+                    self._my_scanner_clock_terminal)
 
                 # Set a CounterInput Control Timebase Source.
                 # Specify the terminal of the timebase which is used for the counter:
@@ -981,6 +1123,35 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     ch,
                     # which channel to count
                     my_photon_sources[i])
+
+                # Set the Read point Relative To an operation.
+                # Specifies the point in the buffer at which to begin a read operation,
+                # here we read samples from beginning of acquisition and do not overwrite
+                daq.DAQmxSetReadRelativeTo(
+                    # define to which task to connect this function
+                    task,
+                    # Start reading samples relative to the last sample returned
+                    # by the previous read
+                    daq.DAQmx_Val_CurrReadPos)
+
+                # Set the Read Offset.
+                # Specifies an offset in samples per channel at which to begin a read
+                # operation. This offset is relative to the location you specify with
+                # RelativeTo. Here we do not read the first sample.
+                daq.DAQmxSetReadOffset(
+                    # connect to this task
+                    task,
+                    # Offset after which to read
+                    1)
+
+                # Set Read OverWrite Mode.
+                # Specifies whether to overwrite samples in the buffer that you have
+                # not yet read. Unread data in buffer will be overwritten:
+                daq.DAQmxSetReadOverWrite(
+                    task,
+                    daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
+                self._set_read_wait_mode(task)
+
                 self._scanner_counter_daq_tasks.append(task)
 
             # Scanner analog input task
@@ -989,23 +1160,67 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
                 daq.DAQmxCreateTask('ScanAnalogIn', daq.byref(atask))
 
-                daq.DAQmxCreateAIVoltageChan(
-                    atask,
-                    ', '.join(self._scanner_ai_channels),
-                    'Scan Analog In',
-                    daq.DAQmx_Val_RSE,
-                    self._counter_voltage_range[0],
-                    self._counter_voltage_range[1],
-                    daq.DAQmx_Val_Volts,
-                    ''
-                )
+                self._create_ai_voltage_chan(
+                    atask, ', '.join(self._scanner_ai_channels), 'Scan Analog In',
+                    self._counter_voltage_range)
+                self._set_read_wait_mode(atask)
                 self._scanner_analog_daq_task = atask
-        except:
+        except Exception:
             self.log.exception('Error while setting up scanner.')
             retval = -1
 
         return retval
 
+    @staticmethod
+    def _create_ai_voltage_chan(task, channels, name, voltage_range):
+        """ Adds referenced single ended analog voltage input channels to a task.
+
+        @param TaskHandle task: the task to add the channels to
+        @param str channels: comma separated list of the physical channels
+        @param str name: name to assign to the channels
+        @param voltage_range: (min, max) of the expected voltage in V
+        """
+        daq.DAQmxCreateAIVoltageChan(
+            # add to this task
+            task,
+            # use these physical channels
+            channels,
+            # name to assign to them
+            name,
+            # measure against the analog input ground
+            daq.DAQmx_Val_RSE,
+            # expected minimum voltage
+            voltage_range[0],
+            # expected maximum voltage
+            voltage_range[1],
+            # units of the measurement
+            daq.DAQmx_Val_Volts,
+            # no custom scale
+            '')
+
+    def _set_read_wait_mode(self, task):
+        """ Lets the reads of a task poll for samples if configured by read_wait_poll.
+
+        @param TaskHandle task: the input task to configure
+        """
+        if self._read_wait_poll:
+            daq.DAQmxSetReadWaitMode(task, daq.DAQmx_Val_Poll)
+
+    def _max_semi_period_counts(self):
+        """ Expected maximum of a semi period measurement in photon ticks.
+
+        The counters of the X series are 32 bit wide, larger values are clipped.
+
+        @return float: maximum count value per semi period of the scanner clock
+        """
+        max_counts = self._max_counts / self._scanner_clock_frequency
+        if max_counts > _MAX_COUNTER_TICKS:
+            self.log.warning('Expected maximum of {0:.0f} counts per semi period exceeds the '
+                             '32 bit counter range, clipping it to {1:d}.'
+                             ''.format(max_counts, _MAX_COUNTER_TICKS))
+            max_counts = _MAX_COUNTER_TICKS
+        return max_counts
+
     def scanner_set_position(self, x=None, y=None, z=None, a=None):
         """ Move stage to x, y, z, a (where a is the fourth channel).
 
@@ -1021,39 +1236,30 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Another scan_line is already running, close this one first.')
             return -1
 
-        if x is not None:
-            if not(self._scanner_position_ranges[0][0] <= x <= self._scanner_position_ranges[0][1]):
-                self.log.error('You want to set x out of range: {0:f}.'.format(x))
-                return -1
-            self._current_position[0] = np.float(x)
-
-        if y is not None:
-            if not(self._scanner_position_ranges[1][0] <= y <= self._scanner_position_ranges[1][1]):
-                self.log.error('You want to set y out of range: {0:f}.'.format(y))
-                return -1
-            self._current_position[1] = np.float(y)
-
-        if z is not None:
-            if not(self._scanner_position_ranges[2][0] <= z <= self._scanner_position_ranges[2][1]):
-                self.log.error('You want to set z out of range: {0:f}.'.format(z))
-                return -1
-            self._current_position[2] = np.float(z)
-
-        if a is not None:
-            if not(self._scanner_position_ranges[3][0] <= a <= self._scanner_position_ranges[3][1]):
-                self.log.error('You want to set a out of range: {0:f}.'.format(a))
-                return -1
-            self._current_position[3] = np.float(a)
+        # not given axes become NaN and keep their current position
+        n_axes = min(len(self._current_position), len(self._scanner_position_limits))
+        new_position = np.array((x, y, z, a)[:n_axes], dtype=np.float64)
+        given = ~np.isnan(new_position)
+        out_of_range = np.flatnonzero(
+            given
+            & ((new_position < self._scanner_position_limits[:n_axes, 0])
+               | (new_position > self._scanner_position_limits[:n_axes, 1])))
+        if out_of_range.size > 0:
+            i = out_of_range[0]
+            self.log.error('You want to set {0} out of range: {1:f}.'.format(
+                'xyza'[i], new_position[i]))
+            return -1
+        self._current_position[:n_axes][given] = new_position[given]
 
-        # the position has to be a vstack
-        my_position = np.vstack(self._current_position)
+        # the position has to be a column per axis, a view is sufficient
+        my_position = self._current_position.reshape(-1, 1)
 
         # then directly write the position to the hardware
         try:
             self._write_scanner_ao(
                 voltages=self._scanner_position_to_volt(my_position),
                 start=True)
-        except:
+        except Exception:
             return -1
         return 0
 
@@ -1068,10 +1274,11 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         n depends on how many channels are configured for analog output
         """
-        # Number of samples which were actually written, will be stored here.
-        # The error code of this variable can be asked with .value to check
-        # whether all channels have been written successfully.
-        self._AONwritten = daq.int32()
+        # DAQmx reads the samples channel by channel straight from memory, so
+        # hand over a C-ordered float64 array to avoid a copy in the driver.
+        if not (isinstance(voltages, np.ndarray) and voltages.dtype == np.float64
+                and voltages.flags.c_contiguous):
+            voltages = np.ascontiguousarray(voltages, dtype=np.float64)
         # write the voltage instructions for the analog output to the hardware
         daq.DAQmxWriteAnalogF64(
             # write to this task
@@ -1108,24 +1315,44 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Given position list is no array type.')
             return np.array([np.NaN])
 
-        vlist = []
-        for i, position in enumerate(positions):
-            vlist.append(
-                (self._scanner_voltage_ranges[i][1] - self._scanner_voltage_ranges[i][0])
-                / (self._scanner_position_ranges[i][1] - self._scanner_position_ranges[i][0])
-                * (position - self._scanner_position_ranges[i][0])
-                + self._scanner_voltage_ranges[i][0]
-            )
-        volts = np.vstack(vlist)
-
-        for i, v in enumerate(volts):
-            if v.min() < self._scanner_voltage_ranges[i][0] or v.max() > self._scanner_voltage_ranges[i][1]:
-                self.log.error(
-                    'Voltages ({0}, {1}) exceed the limit, the positions have to '
-                    'be adjusted to stay in the given range.'.format(v.min(), v.max()))
-                return np.array([np.NaN])
+        positions = np.asarray(positions, dtype=np.float64)
+        if positions.ndim == 1:
+            positions = positions[:, np.newaxis]
+        n_axes = len(positions)
+
+        volts = positions * self._scanner_volt_scale[:n_axes, np.newaxis]
+        volts += self._scanner_volt_offset[:n_axes, np.newaxis]
+
+        v_min = volts.min(axis=1)
+        v_max = volts.max(axis=1)
+        out_of_range = np.flatnonzero(
+            (v_min < self._scanner_volt_limits[:n_axes, 0])
+            | (v_max > self._scanner_volt_limits[:n_axes, 1]))
+        if out_of_range.size > 0:
+            i = out_of_range[0]
+            self.log.error(
+                'Voltages ({0}, {1}) exceed the limit, the positions have to '
+                'be adjusted to stay in the given range.'.format(v_min[i], v_max[i]))
+            return np.array([np.NaN])
         return volts
 
+    def _update_scanner_conversion(self):
+        """ Caches the per-axis affine transformation from position to voltage.
+
+        Has to be called whenever the scanner voltage or position ranges change.
+        """
+        n_axes = min(len(self._scanner_voltage_ranges), len(self._scanner_position_ranges))
+        volt_ranges = np.array(self._scanner_voltage_ranges[:n_axes], dtype=np.float64)
+        pos_ranges = np.array(self._scanner_position_ranges[:n_axes], dtype=np.float64)
+        volt_ranges = volt_ranges.reshape(n_axes, 2)
+        pos_ranges = pos_ranges.reshape(n_axes, 2)
+
+        self._scanner_volt_limits = volt_ranges
+        self._scanner_position_limits = pos_ranges
+        self._scanner_volt_scale = (
+            (volt_ranges[:, 1] - volt_ranges[:, 0]) / (pos_ranges[:, 1] - pos_ranges[:, 0]))
+        self._scanner_volt_offset = volt_ranges[:, 0] - pos_ranges[:, 0] * self._scanner_volt_scale
+
     def get_scanner_position(self):
         """ Get the current position of the scanner hardware.
 
@@ -1153,6 +1380,16 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         self._line_length = length
 
+        # the readout buffers of scan_line are reused as long as the line length stays
+        if self._real_data is None or self._real_data.shape[1] != length:
+            n_counters = len(self._scanner_counter_channels)
+            # count data will be written here, one C-contiguous row per channel so that
+            # every counter task fills and the pair sum streams along a single row
+            self._scan_data = np.empty((n_counters, 2 * length), dtype=np.uint32)
+            self._real_data = np.empty((n_counters, length), dtype=np.uint32)
+            self._analog_data = np.empty(
+                (len(self._scanner_ai_channels), length + 1), dtype=np.float64)
+
         try:
             # Just a formal check whether length is not a too huge number
             if length < np.inf:
@@ -1166,7 +1403,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # add to this task
                     self._scanner_ao_task,
                     # use this channel as clock
-                    self._my_scanner_clock_channel + 'InternalOutput',
+                    self._my_scanner_clock_terminal,
                     # Maximum expected clock frequency
                     self._scanner_clock_frequency,
                     # Generate sample on falling edge
@@ -1176,66 +1413,54 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # number of samples to generate
                     self._line_length)
 
-            # Configure Implicit Timing for the clock.
-            # Set timing for scanner clock task to the number of pixel.
-            daq.DAQmxCfgImplicitTiming(
-                # define task
-                self._scanner_clock_daq_task,
-                # only a limited number of# counts
-                daq.DAQmx_Val_FiniteSamps,
-                # count twice for each voltage +1 for safety
-                self._line_length + 1)
-
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                # Configure Implicit Timing for the scanner counting task.
-                # Set timing for scanner count task to the number of pixel.
+            # The timing of the clock, counter and analog input tasks only depends on
+            # the line length, so it is kept as long as the tasks are not replaced.
+            if self._scanner_timing_setup != ('line', length):
+                self._scanner_timing_setup = None
+                # Configure Implicit Timing for the clock.
+                # Set timing for scanner clock task to the number of pixel.
                 daq.DAQmxCfgImplicitTiming(
                     # define task
-                    task,
-                    # only a limited number of counts
+                    self._scanner_clock_daq_task,
+                    # only a limited number of# counts
                     daq.DAQmx_Val_FiniteSamps,
                     # count twice for each voltage +1 for safety
-                    2 * self._line_length + 1)
-
-                # Set the Read point Relative To an operation.
-                # Specifies the point in the buffer at which to begin a read operation,
-                # here we read samples from beginning of acquisition and do not overwrite
-                daq.DAQmxSetReadRelativeTo(
-                    # define to which task to connect this function
-                    task,
-                    # Start reading samples relative to the last sample returned
-                    # by the previous read
-                    daq.DAQmx_Val_CurrReadPos)
+                    self._line_length + 1)
 
-                # Set the Read Offset.
-                # Specifies an offset in samples per channel at which to begin a read
-                # operation. This offset is relative to the location you specify with
-                # RelativeTo. Here we do not read the first sample.
-                daq.DAQmxSetReadOffset(
-                    # connect to this task
-                    task,
-                    # Offset after which to read
-                    1)
+                for task in self._scanner_counter_daq_tasks:
+                    # Configure Implicit Timing for the scanner counting task.
+                    # Set timing for scanner count task to the number of pixel.
+                    daq.DAQmxCfgImplicitTiming(
+                        # define task
+                        task,
+                        # only a limited number of counts
+                        daq.DAQmx_Val_FiniteSamps,
+                        # count twice for each voltage +1 for safety
+                        2 * self._line_length + 1)
 
-                # Set Read OverWrite Mode.
-                # Specifies whether to overwrite samples in the buffer that you have
-                # not yet read. Unread data in buffer will be overwritten:
-                daq.DAQmxSetReadOverWrite(
-                    task,
-                    daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
+                # Analog channels
+                if self._scanner_ai_channels:
+                    # Analog in channel timebase
+                    daq.DAQmxCfgSampClkTiming(
+                        self._scanner_analog_daq_task,
+                        self._scanner_clock_terminal,
+                        self._scanner_clock_frequency,
+                        daq.DAQmx_Val_Rising,
+                        daq.DAQmx_Val_ContSamps,
+                        self._line_length + 1
+                    )
 
-            # Analog channels
-            if self._scanner_ai_channels:
-                # Analog in channel timebase
-                daq.DAQmxCfgSampClkTiming(
-                    self._scanner_analog_daq_task,
-                    self._scanner_clock_channel + 'InternalOutput',
-                    self._scanner_clock_frequency,
-                    daq.DAQmx_Val_Rising,
-                    daq.DAQmx_Val_ContSamps,
-                    self._line_length + 1
-                )
-        except:
+                # Commit the configured tasks, i.e. reserve the resources and program the
+                # hardware now. Stopping a committed task returns it to the committed
+                # state, so the start and stop of every line does not redo this.
+                daq.DAQmxTaskControl(self._scanner_clock_daq_task, daq.DAQmx_Val_Task_Commit)
+                for task in self._scanner_counter_daq_tasks:
+                    daq.DAQmxTaskControl(task, daq.DAQmx_Val_Task_Commit)
+                if self._scanner_ai_channels:
+                    daq.DAQmxTaskControl(
+                        self._scanner_analog_daq_task, daq.DAQmx_Val_Task_Commit)
+                self._scanner_timing_setup = ('line', length)
+        except Exception:
             self.log.exception('Error while setting up scanner to scan a line.')
             return -1
         return 0
@@ -1267,10 +1492,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Given line_path list is not array type.')
             return np.array([[-1.]])
         try:
-            # set task timing to use a sampling clock:
-            # specify how the Data of the selected task is collected, i.e. set it
-            # now to be sampled by a hardware (clock) signal.
-            daq.DAQmxSetSampTimingType(self._scanner_ao_task, daq.DAQmx_Val_SampClk)
+            # the sample clock timing of the analog output is configured by the line setup
             self._set_up_line(np.shape(line_path)[1])
             line_volts = self._scanner_position_to_volt(line_path)
             # write the positions to the analog output
@@ -1282,49 +1504,35 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # start the timed analog output task
             daq.DAQmxStartTask(self._scanner_ao_task)
 
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                daq.DAQmxStopTask(task)
-
-            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+            # the counter tasks are used several times per line, usually there is only one.
+            # They and the clock are stopped at the end of every line, also on errors.
+            counter_tasks = self._scanner_counter_daq_tasks
 
             if pixel_clock and self._pixel_clock_channel is not None:
                 daq.DAQmxConnectTerms(
-                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_terminal,
                     self._pixel_clock_channel,
                     daq.DAQmx_Val_DoNotInvertPolarity)
 
             # start the scanner counting task that acquires counts synchroneously
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
+            for task in counter_tasks:
                 daq.DAQmxStartTask(task)
 
             if self._scanner_ai_channels:
                 daq.DAQmxStartTask(self._scanner_analog_daq_task)
 
+            # the clock is started last, it gates all the other tasks
             daq.DAQmxStartTask(self._scanner_clock_daq_task)
 
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
-                # wait for the scanner counter to finish
-                daq.DAQmxWaitUntilTaskDone(
-                    # define task
-                    task,
-                    # Maximum timeout for the counter times the positions. Unit is seconds.
-                    self._RWTimeout * 2 * self._line_length)
-
-            # wait for the scanner clock to finish
+            # wait for the scanner clock to finish, the counters sample on its edges,
+            # so they have all their samples once it is done and the reads return at once
             daq.DAQmxWaitUntilTaskDone(
                 # define task
                 self._scanner_clock_daq_task,
                 # maximal timeout for the counter times the positions
                 self._RWTimeout * 2 * self._line_length)
 
-            # count data will be written here
-            self._scan_data = np.empty(
-                (len(self.get_scanner_count_channels()), 2 * self._line_length),
-                dtype=np.uint32)
-
-            # number of samples which were read will be stored here
-            n_read_samples = daq.int32()
-            for i, task in enumerate(self._scanner_counter_daq_tasks):
+            for i, task in enumerate(counter_tasks):
                 # actually read the counted photons
                 daq.DAQmxReadCounterU32(
                     # read from this task
@@ -1338,7 +1546,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # length of array to write into
                     2 * self._line_length,
                     # number of samples which were actually read
-                    daq.byref(n_read_samples),
+                    daq.byref(self._scanner_read_samples),
                     # Reserved for future use. Pass NULL(here None) to this parameter.
                     None)
 
@@ -1347,13 +1555,6 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
             # Analog channels
             if self._scanner_ai_channels:
-                self._analog_data = np.full(
-                    (len(self._scanner_ai_channels), self._line_length + 1),
-                    222,
-                    dtype=np.float64)
-
-                analog_read_samples = daq.int32()
-
                 daq.DAQmxReadAnalogF64(
                     self._scanner_analog_daq_task,
                     self._line_length + 1,
@@ -1361,7 +1562,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     daq.DAQmx_Val_GroupByChannel,
                     self._analog_data,
                     len(self._scanner_ai_channels) * (self._line_length + 1),
-                    daq.byref(analog_read_samples),
+                    daq.byref(self._scanner_analog_read_samples),
                     None
                 )
 
@@ -1375,35 +1576,39 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
             if pixel_clock and self._pixel_clock_channel is not None:
                 daq.DAQmxDisconnectTerms(
-                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_terminal,
                     self._pixel_clock_channel)
 
-            # create a new array for the final data (this time of the length
-            # number of samples):
-            self._real_data = np.empty(
-                (len(self._scanner_counter_channels), self._line_length),
-                dtype=np.uint32)
-
             # add up adjoint pixels to also get the counts from the low time of
             # the clock:
-            self._real_data = self._scan_data[:, ::2]
-            self._real_data += self._scan_data[:, 1::2]
+            n_counters = len(self._scanner_counter_channels)
+            np.add(self._scan_data[:, ::2], self._scan_data[:, 1::2], out=self._real_data)
 
-            all_data = np.full(
-                (len(self.get_scanner_count_channels()), self._line_length), 2, dtype=np.float64)
-            all_data[0:len(self._real_data)] = np.array(
-                self._real_data * self._scanner_clock_frequency, np.float64)
+            # create a new array for the final data (this time of the length
+            # number of samples), callers keep it while scanning the next line.
+            # It is allocated in the returned (samples, channels) layout and the
+            # counts are converted directly into its columns:
+            all_data = np.empty(
+                (self._line_length, len(self._scanner_count_channel_names)), dtype=np.float64)
+            np.multiply(
+                self._real_data.T, self._scanner_clock_frequency, out=all_data[:, :n_counters])
 
             if self._scanner_ai_channels:
-                all_data[len(self._scanner_counter_channels):] = self._analog_data[:, :-1]
+                all_data[:, n_counters:] = self._analog_data[:, :-1].T
 
             # update the scanner position instance variable
             self._current_position = np.array(line_path[:, -1])
-        except:
+        except Exception:
             self.log.exception('Error while scanning line.')
+            # stop the tasks of the failed line, so that the next line can start them again
+            for task in self._scanner_counter_daq_tasks + [self._scanner_clock_daq_task]:
+                try:
+                    daq.DAQmxStopTask(task)
+                except Exception:
+                    self.log.exception('Could not stop scanner task after error.')
             return np.array([[-1.]])
         # return values is a rate of counts/s
-        return all_data.transpose()
+        return all_data
 
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
@@ -1421,7 +1626,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmxClearTask(self._scanner_analog_daq_task)
                 # set the task handle to None as a safety
                 self._scanner_analog_daq_task = None
-            except:
+            except Exception:
                 self.log.exception('Could not close analog.')
                 b = -1
 
@@ -1481,6 +1686,8 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             return -1
 
         my_clock_channel = clock_channel if clock_channel else self._scanner_clock_channel
+        # the scanner tasks change, their timing has to be configured again
+        self._scanner_timing_setup = None
 
         if self._scanner_counter_channels and self._photon_sources:
             my_counter_channel = counter_channel if counter_channel else self._scanner_counter_channels[0]
@@ -1508,7 +1715,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # Expected minimum count value
                     0,
                     # Expected maximum count value
-                    self._max_counts / self._scanner_clock_frequency,
+                    self._max_semi_period_counts(),
                     # units of width measurement, here photon ticks
                     daq.DAQmx_Val_Ticks,
                     '')
@@ -1524,9 +1731,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     task,
                     my_counter_channel,
                     my_photon_source)
+                self._set_read_wait_mode(task)
 
                 self._scanner_counter_daq_tasks.append(task)
-            except:
+            except Exception:
                 self.log.exception('Error while setting up the digital counter of ODMR scan.')
                 return -1
 
@@ -1536,16 +1744,9 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 atask = daq.TaskHandle()
                 daq.DAQmxCreateTask('ODMRAnalog', daq.byref(atask))
 
-                daq.DAQmxCreateAIVoltageChan(
-                    atask,
-                    ', '.join(self._scanner_ai_channels),
-                    'ODMR Analog',
-                    daq.DAQmx_Val_RSE,
-                    -10,
-                    10,
-                    daq.DAQmx_Val_Volts,
-                    ''
-                )
+                self._create_ai_voltage_chan(
+                    atask, ', '.join(self._scanner_ai_channels), 'ODMR Analog', (-10, 10))
+                self._set_read_wait_mode(atask)
                 self._scanner_analog_daq_task = atask
 
             # start and stop pulse task to correctly initiate idle state high voltage.
@@ -1567,10 +1768,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # connect the clock to the trigger channel to give triggers for the
             # microwave
             daq.DAQmxConnectTerms(
-                self._scanner_clock_channel + 'InternalOutput',
+                self._scanner_clock_terminal,
                 self._odmr_trigger_channel,
                 daq.DAQmx_Val_DoNotInvertPolarity)
-        except:
+        except Exception:
             self.log.exception('Error while setting up ODMR scan.')
             return -1
         return 0
@@ -1591,6 +1792,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             return -1
 
         self._odmr_length = length
+        # the timing only depends on the length, keep it as long as the tasks are not replaced
+        if self._scanner_timing_setup == ('odmr', length):
+            return 0
+        self._scanner_timing_setup = None
         try:
             # set timing for odmr clock task to the number of pixel.
             daq.DAQmxCfgImplicitTiming(
@@ -1634,7 +1839,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 # Analog in channel timebase
                 daq.DAQmxCfgSampClkTiming(
                     self._scanner_analog_daq_task,
-                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_terminal,
                     self._scanner_clock_frequency,
                     daq.DAQmx_Val_Rising,
                     daq.DAQmx_Val_ContSamps,
@@ -1645,13 +1850,25 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 # pulser channel timebase
                 daq.DAQmxCfgSampClkTiming(
                     self._odmr_pulser_daq_task,
-                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_terminal,
                     self._scanner_clock_frequency,
                     daq.DAQmx_Val_Rising,
                     daq.DAQmx_Val_ContSamps,
                     self._odmr_length + 1
                 )
-        except:
+
+            # commit the configured tasks so that starting and stopping them for
+            # every sweep does not program the hardware again
+            daq.DAQmxTaskControl(self._scanner_clock_daq_task, daq.DAQmx_Val_Task_Commit)
+            if self._scanner_counter_channels:
+                daq.DAQmxTaskControl(
+                    self._scanner_counter_daq_tasks[0], daq.DAQmx_Val_Task_Commit)
+            if self._scanner_ai_channels:
+                daq.DAQmxTaskControl(self._scanner_analog_daq_task, daq.DAQmx_Val_Task_Commit)
+            if self._odmr_pulser_daq_task:
+                daq.DAQmxTaskControl(self._odmr_pulser_daq_task, daq.DAQmx_Val_Task_Commit)
+            self._scanner_timing_setup = ('odmr', length)
+        except Exception:
             self.log.exception('Error while setting up ODMR counter.')
             return -1
         return 0
@@ -1666,6 +1883,14 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('oversampling has to be int of float.')
         else:
             self._oversampling = int(val)
+            # The pulse pattern is an alternating 0 and 1 on the switching channel (line0),
+            # while the first half of the whole microwave pulse is 1 and the other half is 0.
+            # This way the beginning of the microwave has a rising edge.
+            # It only depends on the oversampling, so it is built once here.
+            pulse_pattern = np.zeros(self._oversampling * 2, dtype=np.uint32)
+            pulse_pattern[:self._oversampling] = 1
+            pulse_pattern[::2] += 2
+            self._odmr_pulse_pattern = pulse_pattern
 
     @property
     def lock_in_active(self):
@@ -1716,20 +1941,15 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmxStartTask(self._scanner_counter_daq_tasks[0])
             if self._scanner_ai_channels:
                 daq.DAQmxStartTask(self._scanner_analog_daq_task)
-        except:
+        except Exception:
             self.log.exception('Cannot start ODMR counter.')
             return True, np.array([-1.])
 
         if self._odmr_pulser_daq_task:
             try:
 
-                # The pulse pattern is an alternating 0 and 1 on the switching channel (line0),
-                # while the first half of the whole microwave pulse is 1 and the other half is 0.
-                # This way the beginning of the microwave has a rising edge.
-                pulse_pattern = np.zeros(self.oversampling * 2, dtype=np.uint32)
-                pulse_pattern[:self.oversampling] += 1
-                pulse_pattern[::2] += 2
-
+                # write the pulse pattern built for the current oversampling
+                pulse_pattern = self._odmr_pulse_pattern
                 daq.DAQmxWriteDigitalU32(self._odmr_pulser_daq_task,
                                          len(pulse_pattern),
                                          0,
@@ -1740,7 +1960,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                                          None)
 
                 daq.DAQmxStartTask(self._odmr_pulser_daq_task)
-            except:
+            except Exception:
                 self.log.exception('Cannot start ODMR pulser.')
                 return True, np.array([-1.])
 
@@ -1756,14 +1976,13 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
             # Digital
             if self._scanner_counter_channels:
-                # count data will be written here
-                odmr_data = np.full(
-                    (2 * self._odmr_length + 1, ),
-                    222,
-                    dtype=np.uint32)
-
-                #number of samples which were read will be stored here
-                n_read_samples = daq.int32()
+                # count data will be written here, the buffer is reused by every sweep
+                # of the same length
+                if (self._odmr_count_buffer is None
+                        or self._odmr_count_buffer.shape[0] != 2 * self._odmr_length + 1):
+                    self._odmr_count_buffer = np.empty(
+                        (2 * self._odmr_length + 1, ), dtype=np.uint32)
+                odmr_data = self._odmr_count_buffer
 
                 # actually read the counted photons
                 daq.DAQmxReadCounterU32(
@@ -1778,18 +1997,17 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     # length of array to write into
                     2 * self._odmr_length + 1,
                     # number of samples which were actually read
-                    daq.byref(n_read_samples),
+                    daq.byref(self._scanner_read_samples),
                     # Reserved for future use. Pass NULL (here None) to this parameter.
                     None)
 
             # Analog
             if self._scanner_ai_channels:
-                odmr_analog_data = np.full(
-                    (len(self._scanner_ai_channels), self._odmr_length + 1),
-                    222,
-                    dtype=np.float64)
-
-                analog_read_samples = daq.int32()
+                analog_shape = (len(self._scanner_ai_channels), self._odmr_length + 1)
+                if (self._odmr_analog_buffer is None
+                        or self._odmr_analog_buffer.shape != analog_shape):
+                    self._odmr_analog_buffer = np.empty(analog_shape, dtype=np.float64)
+                odmr_analog_data = self._odmr_analog_buffer
 
                 daq.DAQmxReadAnalogF64(
                     self._scanner_analog_daq_task,
@@ -1798,7 +2016,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                     daq.DAQmx_Val_GroupByChannel,
                     odmr_analog_data,
                     len(self._scanner_ai_channels) * (self._odmr_length + 1),
-                    daq.byref(analog_read_samples),
+                    daq.byref(self._scanner_analog_read_samples),
                     None
                 )
 
@@ -1811,63 +2029,61 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             if self._odmr_pulser_daq_task:
                 daq.DAQmxStopTask(self._odmr_pulser_daq_task)
 
-            # prepare array to return data
-            all_data = np.full((len(self.get_odmr_channels()), length),
-                               222,
-                               dtype=np.float64)
+            # prepare array to return data, every row is filled below
+            all_data = np.empty((len(self.get_odmr_channels()), length), dtype=np.float64)
             start_index = 0
             if self._scanner_counter_channels:
-                # create a new array for the final data (this time of the length
-                # number of samples)
-                real_data = np.zeros((self._odmr_length, ), dtype=np.uint32)
-
-                # add upp adjoint pixels to also get the counts from the low time of
-                # the clock:
-
-                real_data += odmr_data[1:-1:2]
-                real_data += odmr_data[:-1:2]
+                # add up adjoint pixels to also get the counts from the low time of
+                # the clock, this creates the array for the final data (this time of
+                # the length number of samples) in a single contiguous pass. The
+                # last sample is dropped, it belongs to the pulse starting the task:
+                real_data = odmr_data[:-1].reshape((self._odmr_length, 2)).sum(
+                    axis=1, dtype=np.uint32)
 
                 if self._odmr_pulser_daq_task:
-                    differential_data = np.zeros((self.oversampling * length, ), dtype=np.float64)
-
-                    differential_data += real_data[1::2]
-                    differential_data -= real_data[::2]
-                    differential_data = np.divide(differential_data, real_data[::2],
-                                                  np.zeros_like(differential_data),
-                                                  where=real_data[::2] != 0)
-
-                    all_data[0] = np.median(np.reshape(differential_data,
-                                                       (-1, self.oversampling)),
-                                            axis=1
-                                            )
+                    all_data[0] = self._odmr_lock_in_signal(real_data)
                 else:
-                    all_data[0] = np.array(real_data * self._scanner_clock_frequency, np.float64)
+                    np.multiply(real_data, self._scanner_clock_frequency, out=all_data[0])
                 start_index += 1
 
             if self._scanner_ai_channels:
                 if self._odmr_pulser_daq_task:
-                    for i, analog_data in enumerate(odmr_analog_data):
-                        differential_data = np.zeros((self.oversampling * length, ), dtype=np.float64)
-
-                        differential_data += analog_data[1:-1:2]
-                        differential_data -= analog_data[:-1:2]
-                        differential_data = np.divide(differential_data, analog_data[:-1:2],
-                                                      np.zeros_like(differential_data),
-                                                      where=analog_data[:-1:2] != 0)
-
-                        all_data[i+start_index] = np.median(np.reshape(differential_data,
-                                                                       (-1, self.oversampling)),
-                                                            axis=1
-                                                            )
-
+                    all_data[start_index:] = self._odmr_lock_in_signal(odmr_analog_data[:, :-1])
                 else:
                     all_data[start_index:] = odmr_analog_data[:, :-1]
 
             return False, all_data
-        except:
+        except Exception:
             self.log.exception('Error while counting for ODMR.')
             return True, np.full((len(self.get_odmr_channels()), 1), [-1.])
 
+    def _odmr_lock_in_signal(self, data):
+        """ Computes the lock-in signal of samples alternating between microwave off and on.
+
+        @param numpy.ndarray data: samples of one or several channels along the last axis,
+                                   oversampling pairs of (off, on) samples per pixel
+
+        @return numpy.ndarray: median relative difference (on - off) / off per pixel,
+                               pairs with off == 0 contribute 0
+        """
+        off_data = data[..., ::2]
+        valid = off_data != 0
+        differential_data = np.subtract(data[..., 1::2], off_data, dtype=np.float64)
+        np.divide(differential_data, off_data, out=differential_data, where=valid)
+        # the pairs which could not be divided still hold the difference, zero them
+        differential_data *= valid
+        pixel_shape = differential_data.shape[:-1] + (-1, self.oversampling)
+        pixel_data = differential_data.reshape(pixel_shape)
+
+        # the median of each pixel only needs the middle element(s) in place,
+        # a partial partition of the small windows is enough
+        half = self.oversampling // 2
+        if self.oversampling % 2:
+            pixel_data.partition(half, axis=-1)
+            return pixel_data[..., half]
+        pixel_data.partition((half - 1, half), axis=-1)
+        return 0.5 * (pixel_data[..., half - 1] + pixel_data[..., half])
+
     def close_odmr(self):
         """ Closes the odmr and cleans up afterwards.
 
@@ -1877,10 +2093,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         try:
             # disconnect the trigger channel
             daq.DAQmxDisconnectTerms(
-                self._scanner_clock_channel + 'InternalOutput',
+                self._scanner_clock_terminal,
                 self._odmr_trigger_channel)
 
-        except:
+        except Exception:
             self.log.exception('Error while disconnecting ODMR clock channel.')
             retval = -1
 
@@ -1892,7 +2108,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmxClearTask(self._scanner_analog_daq_task)
                 # set the task handle to None as a safety
                 self._scanner_analog_daq_task = None
-            except:
+            except Exception:
                 self.log.exception('Could not close analog.')
                 retval = -1
 
@@ -1904,7 +2120,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 daq.DAQmxClearTask(self._odmr_pulser_daq_task)
                 # set the task handle to None as a safety
                 self._odmr_pulser_daq_task = None
-            except:
+            except Exception:
                 self.log.exception('Could not close pulser.')
                 retval = -1
 
@@ -1943,7 +2159,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             # return value represents a uint32 value, i.e.
             #   task_done = 0  => False, i.e. device is runnin
             #   task_done !=0  => True, i.e. device has stopped
-            task_done = daq.bool32()
+            task_done = self._task_done
 
             ret_v = daq.DAQmxIsTaskDone(
                 # task reference
@@ -2033,23 +2249,18 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 # buffer length which stores temporarily the number of generated samples
                 buffer_length)
 
-            # Read samples from beginning of acquisition, do not overwrite
-            daq.DAQmxSetReadRelativeTo(self._gated_counter_daq_task, daq.DAQmx_Val_CurrReadPos)
-
             # If this is set to True, then the NiDaq will not wait for the sample
             # you asked for to be in the buffer before read out but immediately
             # hand back all samples until samples is reached.
             if read_available_samples:
                 daq.DAQmxSetReadReadAllAvailSamp(self._gated_counter_daq_task, True)
 
-            # Do not read first sample:
-            daq.DAQmxSetReadOffset(self._gated_counter_daq_task, 0)
-
-            # Unread data in buffer is not overwritten
+            # Unread data in buffer is not overwritten. Reading starts at the
+            # current read position without offset, the default of a new task.
             daq.DAQmxSetReadOverWrite(
                 self._gated_counter_daq_task,
                 daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
-        except:
+        except Exception:
             self.log.exception('Error while setting up gated counting.')
             return -1
         return 0
@@ -2067,13 +2278,14 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
 
         try:
             daq.DAQmxStartTask(self._gated_counter_daq_task)
-        except:
+        except Exception:
             self.log.exception('Error while starting up gated counting.')
             return -1
         return 0
 
 
-    def get_gated_counts(self, samples=None, timeout=None, read_available_samples=False):
+    def get_gated_counts(self, samples=None, timeout=None, read_available_samples=False,
+                         min_batch=None):
         """ Returns latest count samples acquired by gated photon counting.
 
         @param int samples: if defined, number of samples to read in one go.
@@ -2088,6 +2300,12 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                                              buffer before, True it returns
                                              what is in buffer until 'samples'
                                              is full.
+        @param int min_batch: optional, if given and fewer samples than this are
+                              waiting in the buffer, None is returned without
+                              blocking, so that small reads are collected into
+                              one driver call.
+
+        The returned array is a view on a buffer that is overwritten by the next call.
         """
         if samples is None:
             samples = int(self._samples_number)
@@ -2098,20 +2316,29 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             timeout = self._RWTimeout
 
         # Count data will be written here
-        _gated_count_data = np.empty([2,samples], dtype=np.uint32)
+        if self._gated_count_buffer is None or self._gated_count_buffer.shape[1] != samples:
+            self._gated_count_buffer = np.empty((2, samples), dtype=np.uint32)
+        _gated_count_data = self._gated_count_buffer
 
         # Number of samples which were read will be stored here
-        n_read_samples = daq.int32()
-
-        if read_available_samples:
-            # If the task acquires a finite number of samples
-            # and you set this parameter to -1, the function
-            # waits for the task to acquire all requested
-            # samples, then reads those samples.
-            num_samples = -1
-        else:
-            num_samples = int(samples)
+        n_read_samples = self._gated_read_samples
+
         try:
+            if read_available_samples or min_batch is not None:
+                available = self._gated_available_samples
+                daq.DAQmxGetReadAvailSampPerChan(self._gated_counter_daq_task,
+                                                 daq.byref(available))
+                if min_batch is not None and available.value < min_batch:
+                    return None
+
+            if read_available_samples:
+                # drain everything already in the buffer in one call
+                num_samples = min(available.value, samples)
+                if num_samples == 0:
+                    return _gated_count_data[0][:0], 0
+            else:
+                num_samples = samples
+
             daq.DAQmxReadCounterU32(
                 # read from this task
                 self._gated_counter_daq_task,
@@ -2119,8 +2346,8 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 num_samples,
                 # maximal timeout for the read process
                 timeout,
-                _gated_count_data[0],
                 # write into this array
+                _gated_count_data[0],
                 # length of array to write into
                 samples,
                 # number of samples which were actually read.
@@ -2134,7 +2361,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
                 return _gated_count_data[0][:n_read_samples.value], n_read_samples.value
             else:
                 return _gated_count_data
-        except:
+        except Exception:
             self.log.exception('Error while reading gated count data.')
             return np.array([-1])
 
@@ -2150,7 +2377,7 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             return -1
         try:
             daq.DAQmxStopTask(self._gated_counter_daq_task)
-        except:
+        except Exception:
             self.log.exception('Error while stopping gated counting.')
             return -1
         return 0
@@ -2164,14 +2391,14 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         try:
             # stop the task
             daq.DAQmxStopTask(self._gated_counter_daq_task)
-        except:
+        except Exception:
             self.log.exception('Error while closing gated counter.')
             retval = -1
         try:
             # clear the task
             daq.DAQmxClearTask(self._gated_counter_daq_task)
             self._gated_counter_daq_task = None
-        except:
+        except Exception:
             self.log.exception('Error while clearing gated counter.')
             retval = -1
         return retval
@@ -2193,24 +2420,67 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         if channel_name is None:
             self.log.error('No channel for digital output specified')
             return -1
-        else:
 
-            self.digital_out_task = daq.TaskHandle()
-            if mode:
-                self.digital_data = daq.c_uint32(0xffffffff)
-            else:
-                self.digital_data = daq.c_uint32(0x0)
-            self.digital_read = daq.c_int32()
-            self.digital_samples_channel = daq.c_int32(1)
-            daq.DAQmxCreateTask('DigitalOut', daq.byref(self.digital_out_task))
-            daq.DAQmxCreateDOChan(self.digital_out_task, channel_name, "", daq.DAQmx_Val_ChanForAllLines)
-            daq.DAQmxStartTask(self.digital_out_task)
-            daq.DAQmxWriteDigitalU32(self.digital_out_task, self.digital_samples_channel, True,
-                                        self._RWTimeout, daq.DAQmx_Val_GroupByChannel,
-                                        np.array(self.digital_data), self.digital_read, None)
-
-            daq.DAQmxStopTask(self.digital_out_task)
-            daq.DAQmxClearTask(self.digital_out_task)
+        task = self._digital_out_tasks.get(channel_name)
+        if task is None:
+            task = daq.TaskHandle()
+            try:
+                daq.DAQmxCreateTask('DigitalOut', daq.byref(task))
+                daq.DAQmxCreateDOChan(task, channel_name, "", daq.DAQmx_Val_ChanForAllLines)
+                # reserve and program the line once, so that every following
+                # switch is a single write
+                daq.DAQmxTaskControl(task, daq.DAQmx_Val_Task_Commit)
+            except Exception:
+                self.log.exception('Could not create digital output task for {0}.'
+                                   ''.format(channel_name))
+                try:
+                    daq.DAQmxClearTask(task)
+                except Exception:
+                    pass
+                return -1
+            self._digital_out_tasks[channel_name] = task
+
+        digital_data = _DIGITAL_ON if mode else _DIGITAL_OFF
+        try:
+            daq.DAQmxWriteDigitalU32(
+                # write to this task
+                task,
+                # write one sample per channel
+                1,
+                # start the task before writing
+                True,
+                # timeout for writing
+                self._RWTimeout,
+                # interleaving of the data
+                daq.DAQmx_Val_GroupByChannel,
+                # data to write
+                digital_data,
+                # number of samples written per channel
+                daq.byref(self._digital_written),
+                # reserved
+                None)
+        except Exception:
+            self.log.exception('Could not switch digital output {0}.'.format(channel_name))
+            return -1
+        return 0
+
+    def close_digital_channel(self, channel_name):
+        """ Stops and clears the digital output task of one channel, so that the
+        line is released for other tasks.
+
+        @param str channel_name: Name of the channel, for example ('/Dev1/PFI9')
+
+        @return int: error code (0:OK, -1:error)
+        """
+        task = self._digital_out_tasks.pop(channel_name, None)
+        if task is None:
             return 0
+        try:
+            self._close_task(task)
+        except Exception:
+            self.log.exception('Could not close digital output task for {0}.'
+                               ''.format(channel_name))
+            return -1
+        return 0
 
 
@@ -258,18 +258,19 @@ class BasicPredefinedGenerator(PredefinedGeneratorBase):
                                                      increment=0)
         delay_element = self._get_delay_gate_element()
 
+        # the pi pulse parameters are the same for every frequency
+        pi_length = self.rabi_period / 2
+        mw_amplitude = self.microwave_amplitude
+
         # Create block and append to created_blocks list
         pulsedodmr_block = PulseBlock(name=name)
         for mw_freq in freq_array:
-            mw_element = self._get_mw_element(length=self.rabi_period / 2,
+            mw_element = self._get_mw_element(length=pi_length,
                                               increment=0,
-                                              amp=self.microwave_amplitude,
+                                              amp=mw_amplitude,
                                               freq=mw_freq,
                                               phase=0)
-            pulsedodmr_block.append(mw_element)
-            pulsedodmr_block.append(laser_element)
-            pulsedodmr_block.append(delay_element)
-            pulsedodmr_block.append(waiting_element)
+            pulsedodmr_block.extend((mw_element, laser_element, delay_element, waiting_element))
         created_blocks.append(pulsedodmr_block)
 
         # Create block ensemble
@@ -358,8 +358,35 @@ class PulseBlock(object):
         return
 
     def extend(self, iterable):
-        for element in iterable:
-            self.append(element=element)
+        """ Append all PulseBlockElements of an iterable at once. The elements are checked
+        before the first one is added, so the PulseBlock stays unchanged if one of them is invalid.
+
+        @param iterable iterable: PulseBlockElement instances to append
+        """
+        elements = list(iterable)
+        channel_set = self.channel_set
+        for element in elements:
+            if not isinstance(element, PulseBlockElement):
+                raise ValueError('PulseBlock elements must be of type PulseBlockElement, not {0}'
+                                 ''.format(type(element)))
+            if not channel_set:
+                channel_set = element.channel_set
+            elif element.channel_set != channel_set:
+                raise ValueError('Usage of different sets of analog and digital channels in the '
+                                 'same PulseBlock is prohibited. Used channel sets are:\n{0}\n{1}'
+                                 ''.format(channel_set, element.channel_set))
+        if not elements:
+            return
+
+        if not self.channel_set:
+            self.channel_set = channel_set.copy()
+            self.analog_channels = {chnl for chnl in self.channel_set if chnl.startswith('a')}
+            self.digital_channels = {chnl for chnl in self.channel_set if chnl.startswith('d')}
+
+        for element in elements:
+            self.init_length_s += element.init_length_s
+            self.increment_s += element.increment_s
+        self.element_list.extend(copy.deepcopy(element) for element in elements)
         return
 
     def clear(self):